@@ -10,7 +10,7 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from predictions import predict_one_entity
 from preprocessing  import load_and_process_for_api
-from market_suggest import get_market_suggestions
+from market_suggest import get_market_suggestions, INFERENCE_EXECUTOR
 from fastapi.middleware.cors import CORSMiddleware 
 
 
@@ -86,6 +86,10 @@ class SuggestionRequest(BaseModel):
     end_date : date
     # num_days: int
     
+@app.on_event("shutdown")
+def shutdown_inference_executor():
+    INFERENCE_EXECUTOR.shutdown(wait=True, cancel_futures=True)
+
 @app.get("/")
 def root():
     return {"message": "CropNex Prediction API is working sucessfully"} 
@@ -128,7 +132,7 @@ def predict_endpoint(request: PredictionRequest):
 # !!!! ---- there is a problem with the state, when we set state for suggestions it is using the same state for all places.
     
 @app.post("/suggest")
-def market_suggestions(request: SuggestionRequest):
+async def market_suggestions(request: SuggestionRequest):
     try:
         commodity = request.commodity
         state = request.state  
@@ -144,7 +148,7 @@ def market_suggestions(request: SuggestionRequest):
         if entity not in entity_groups:
             raise HTTPException(status_code=404, detail=f"Entity '{entity}' not found in database.")
 
-        suggestions = get_market_suggestions(
+        suggestions = await get_market_suggestions(
             entity, radius, start_date, end_date, model, device,
             entity_groups, features, seq_length, price_scaler, weather_scaler
         )
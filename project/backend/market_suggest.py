@@ -1,8 +1,13 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import numpy as np
+import torch
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
+from geopy.extra.rate_limiter import RateLimiter
 import json
-from predictions import predict_one_entity 
+from predictions import predict_one_entity, check_start_date
 
 # This part is fine and doesn't need changes
 POTENTIAL_MARKET_LOCATIONS = [
@@ -15,27 +20,92 @@ POTENTIAL_MARKET_LOCATIONS = [
     {'name': 'L B Nagar', 'state': 'Telangana'},
 ]
 
-def get_distance(place1, place2):
-    # This function is also fine
-    geolocator = Nominatim(user_agent="market_suggestion_app_v4")
+# Nominatim's usage policy allows one request per second, so every lookup goes
+# through a single shared, thread-safe rate limiter.
+geolocator = Nominatim(user_agent="market_suggestion_app_v4")
+geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1, swallow_exceptions=False)
+
+# Successful lookups only, so a timed-out place is retried on the next request.
+_coordinates_cache = {}
+
+def _geocode(place):
+    if place not in _coordinates_cache:
+        location = geocode(place, timeout=10)
+        if not location:
+            return None
+        _coordinates_cache[place] = (location.latitude, location.longitude)
+    return _coordinates_cache[place]
+
+def get_distance(place1, place2, coords_1=None):
     try:
-        location1 = geolocator.geocode(place1, timeout=10)
-        location2 = geolocator.geocode(place2, timeout=10)
+        coords_1 = coords_1 or _geocode(place1)
+        coords_2 = _geocode(place2)
     except Exception as e:
         print(f"Warning: Geocoding error for '{place1}' or '{place2}': {e}")
         return -1
 
-    if location1 and location2:
-        coords_1 = (location1.latitude, location1.longitude)
-        coords_2 = (location2.latitude, location2.longitude)
+    if coords_1 and coords_2:
         return round(geodesic(coords_1, coords_2).kilometers, 2)
     else:
-        missing = [p for p, loc in [(place1, location1), (place2, location2)] if not loc]
+        missing = [p for p, coords in [(place1, coords_1), (place2, coords_2)] if not coords]
         print(f"Warning: Location(s) {', '.join(missing)} could not be geocoded.")
         return -1
 
+# Forecasts are CPU-bound and run on their own pool so they never queue behind
+# geocoding lookups, which use asyncio's default executor instead. On CPU torch's
+# intra-op pool already uses every core, so a single worker avoids oversubscribing it.
+INFERENCE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=4 if torch.cuda.is_available() else 1, thread_name_prefix="inference"
+)
+
+async def _run_forecast(entity_str, start_date, end_date, model, device, entity_groups, features, seq_length, price_scaler, weather_scaler):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        INFERENCE_EXECUTOR,
+        partial(
+            predict_one_entity, model, device, entity_str, entity_groups, features, seq_length,
+            start_date, end_date, price_scaler, weather_scaler
+        )
+    )
+
+async def _resolve_candidate(original_market, origin_coords_task, geocode_slot, market_info, prospective_entity_str, radius_km, forecast_args):
+    # Distance first; only markets inside the radius go on to the forecast stage,
+    # which starts as soon as this candidate is resolved rather than after all of them.
+    area_name = market_info['name']
+    origin_coords = await origin_coords_task
+    if origin_coords is None:
+        return None
+    async with geocode_slot:
+        distance = await asyncio.to_thread(get_distance, original_market, area_name, origin_coords)
+    if distance == -1 or distance > radius_km:
+        return None
+
+    price_predictions = await _run_forecast(prospective_entity_str, *forecast_args)
+    return {
+        'name': area_name,
+        'full_entity': prospective_entity_str,
+        'distance': distance,
+        'price_predictions': price_predictions
+    }
+
+async def _geocode_origin(original_market, geocode_slot):
+    try:
+        async with geocode_slot:
+            origin_coords = await asyncio.to_thread(_geocode, original_market)
+    except Exception as e:
+        print(f"Warning: Geocoding error for '{original_market}': {e}")
+        return None
+    if origin_coords is None:
+        print(f"Warning: Location(s) {original_market} could not be geocoded.")
+    return origin_coords
+
+async def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
 # --- REFACTORED FUNCTION ---
-def get_market_suggestions(entity_str, radius_km, start_date, end_date, model, device, entity_groups, features, seq_length, price_scaler, weather_scaler):
+async def get_market_suggestions(entity_str, radius_km, start_date, end_date, model, device, entity_groups, features, seq_length, price_scaler, weather_scaler):
     
     try:
         original_state, original_market, original_commodity = [s.strip() for s in entity_str.split('|')]
@@ -43,45 +113,64 @@ def get_market_suggestions(entity_str, radius_km, start_date, end_date, model, d
         # This is an internal error, but good to handle.
         return f"Internal Error: Entity string '{entity_str}' is not in the correct format."
 
+    # A bad start date fails the same way for every market, so reject it before any stage starts.
+    start_date_error = check_start_date(start_date)
+    if start_date_error:
+        print(f"Error predicting for original entity '{entity_str}': {start_date_error}")
+        return start_date_error
+
+    forecast_args = (start_date, end_date, model, device, entity_groups, features, seq_length, price_scaler, weather_scaler)
+
+    # The origin forecast runs alongside candidate distance resolution and forecasts,
+    # so the request takes as long as the slowest stage rather than the sum of them.
+    original_task = asyncio.create_task(_run_forecast(entity_str, *forecast_args))
+    # Lookups are handed to a thread one at a time, so cancelled candidates never send a request.
+    geocode_slot = asyncio.Semaphore(1)
+    origin_coords_task = asyncio.create_task(_geocode_origin(original_market, geocode_slot))
+
+    candidate_tasks = []
+    for market_info in POTENTIAL_MARKET_LOCATIONS:
+        area_name, area_state = market_info['name'], market_info['state']
+        if area_name == original_market: 
+            continue
+
+        prospective_entity_str = f"{area_state} | {area_name} | {original_commodity}"
+        if prospective_entity_str not in entity_groups:
+            continue
+
+        candidate_tasks.append(asyncio.create_task(
+            _resolve_candidate(original_market, origin_coords_task, geocode_slot, market_info, prospective_entity_str, radius_km, forecast_args)
+        ))
+
+    try:
+        original_price_predictions = await original_task
+    except BaseException:
+        await _cancel([origin_coords_task, *candidate_tasks])
+        raise
+
     # --- FIX 1: Handle errors from the original prediction ---
-    # Get predictions for the original entity first
-    original_price_predictions = predict_one_entity(
-        model, device, entity_str, entity_groups, features, seq_length, 
-        start_date, end_date, price_scaler, weather_scaler
-    )
-    
     # If predict_one_entity returns an error string (e.g., for a future date), pass it up.
+    # Candidate work is cancelled as soon as the origin turns out to be unusable.
     if isinstance(original_price_predictions, str):
         print(f"Error predicting for original entity '{entity_str}': {original_price_predictions}")
+        await _cancel([origin_coords_task, *candidate_tasks])
         # Return the exact error message from the prediction function
         return original_price_predictions
     
     if not hasattr(original_price_predictions, '__len__') or len(original_price_predictions) == 0:
+        await _cancel([origin_coords_task, *candidate_tasks])
         return f"Could not generate price predictions for your selected market '{original_market}'."
         
     original_avg_price = float(np.mean(original_price_predictions))
     print(f"Average predicted price for '{original_market}' ({original_commodity}): {original_avg_price:.2f}")
 
     print(f"\nFinding candidate markets within {radius_km}km radius...")
-    
-    candidate_markets = []
-    for market_info in POTENTIAL_MARKET_LOCATIONS:
-        area_name, area_state = market_info['name'], market_info['state']
-        if area_name == original_market: 
-            continue
 
-        prospective_entity_str = f"{area_state} | {area_name} | {original_commodity}"
-        if prospective_entity_str not in entity_groups:
-            continue
-
-        distance = get_distance(original_market, area_name)
-        if distance != -1 and distance <= radius_km:
-            candidate_markets.append({
-                'name': area_name,
-                'full_entity': prospective_entity_str,
-                'distance': distance
-            })
-            print(f"  -> Found candidate: '{area_name}' ({distance:.2f}km away)")
+    candidate_markets = []
+    for result in await asyncio.gather(*candidate_tasks):
+        if result is not None:
+            candidate_markets.append(result)
+            print(f"  -> Found candidate: '{result['name']}' ({result['distance']:.2f}km away)")
     
     # --- FIX 2: Handle case where no markets are found in the radius ---
     if not candidate_markets:
@@ -95,10 +184,7 @@ def get_market_suggestions(entity_str, radius_km, start_date, end_date, model, d
         cand_entity_str, cand_market_name = cand_market_info['full_entity'], cand_market_info['name']
         print(f"  Checking price for: '{cand_entity_str}'")
         
-        cand_price_predictions = predict_one_entity(
-            model, device, cand_entity_str, entity_groups, features, seq_length, 
-            start_date, end_date, price_scaler, weather_scaler
-        )
+        cand_price_predictions = cand_market_info['price_predictions']
 
         if isinstance(cand_price_predictions, str) or not hasattr(cand_price_predictions, '__len__') or len(cand_price_predictions) == 0:
             print(f"    -> Skipping '{cand_market_name}': Could not get valid predictions.")
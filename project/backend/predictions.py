@@ -103,15 +103,13 @@ def get_predictions_for_entity_single(model, entity_name, entity_data, features,
 
 from datetime import date, datetime
 
-def predict_one_entity(model, device, entity, entity_groups, features, seq_length, start_date, end_date, price_scaler, weather_scaler):
+def check_start_date(start_date):
     """
-    Wrapper function to predict prices for a single entity by name.
-    
-    Validates that the start date is not in the future and then proceeds with prediction.
-    
-    Prerequisite: The DataFrames inside 'entity_groups' must have a DatetimeIndex.
+    Validates that predictions can start from the given date.
+
+    Returns:
+        str or None: An error message if the start date is unusable, otherwise None.
     """
-    
     try:
         today = date.today()
         if start_date > today:
@@ -119,6 +117,20 @@ def predict_one_entity(model, device, entity, entity_groups, features, seq_lengt
             
     except ValueError:
         return f" Error : The start date '{start_date}' is not in the expected YYYY-MM-DD format."
+    return None
+
+def predict_one_entity(model, device, entity, entity_groups, features, seq_length, start_date, end_date, price_scaler, weather_scaler):
+    """
+    Wrapper function to predict prices for a single entity by name.
+    
+    Validates that the start date is not in the future and then proceeds with prediction.
+    
+    Prerequisite: The DataFrames inside 'entity_groups' must have a DatetimeIndex.
+    """
+    
+    start_date_error = check_start_date(start_date)
+    if start_date_error:
+        return start_date_error
     entity_name = entity
     entity_data = entity_groups.get(entity_name)
     